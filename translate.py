@@ -4,14 +4,40 @@
 import os
 import sys
 import argparse
+import hashlib
+import json
+import re
+import sqlite3
 import time
-from typing import List, Dict, Any, Tuple
+import threading
+from concurrent.futures import Executor, Future, ThreadPoolExecutor
+from email.utils import parsedate_to_datetime
+from typing import List, Dict, Tuple, Optional, Iterator
+from urllib.parse import urlencode
 
+import numpy as np
 import pandas as pd
 import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
+try:
+    # opciono: brže parsiranje DeepL odgovora
+    import orjson
+    _json_loads = orjson.loads
+except ImportError:
+    _json_loads = json.loads
 
 DEEPL_API_KEY = os.getenv("DEEPL_API_KEY", "").strip()
 DEEPL_URL = os.getenv("DEEPL_API_URL", "https://api-free.deepl.com/v2/translate").strip()
+DEEPL_CACHE_PATH = "translations.db"
+
+# Paralelno slanje batch-eva ka DeepL-u
+DEEPL_BATCH_SIZE = 50
+# DeepL prima najviše 128 KiB po zahtevu; ostavljamo rezervu za ostale parametre
+DEEPL_MAX_BATCH_BYTES = 120_000
+# Podrazumevani broj radnika = broj zahteva "u letu" (Free nalog brzo vraća 429)
+DEEPL_CONCURRENCY = int(os.getenv("DEEPL_CONCURRENCY", "8"))
 
 # Friendy nazivi jezika -> DeepL target kodovi
 LANG_ALIASES = {
@@ -66,6 +92,15 @@ ATTRIBUTE_NAME_SUFFIX = " name"
 ATTRIBUTE_VALUES_SUFFIX = " value(s)"
 HTML_LIKE_KEYS = ["description", "content", "excerpt", "short description"]
 
+# tipične tekstualne kolone
+TEXTUAL_KEYS = [
+    "name", "title", "description", "short description", "excerpt", "content",
+    "meta: rank_math_title", "meta: rank_math_description", "yoast", "og:", "twitter:", "seo",
+]
+
+# bilo koje slovo (Unicode), bez cifara i "_"
+_ALPHA_RE = re.compile(r"[^\W\d_]")
+
 # Prepoznavanje "ingredients" u više jezika
 INGREDIENTS_KEYS = [
     "ingredients", "ingredienti", "ingredientes", "ingrédients", "ingrediens", "inhaltstoffe", "inhaltsstoffe",
@@ -74,6 +109,15 @@ INGREDIENTS_KEYS = [
     "sastojci", "sastav", "sestavine", "состав", "склад", "ingrediente"
 ]
 
+def _keys_re(keys: List[str]) -> "re.Pattern[str]":
+    # jedna alternacija umesto any(k in c for k in keys); ključevi su lowercase
+    return re.compile("|".join(map(re.escape, keys)))
+
+_NEVER_RE = _keys_re(NEVER_TRANSLATE_KEYS)
+_INGREDIENT_RE = _keys_re(INGREDIENTS_KEYS)
+_HTML_RE = _keys_re(HTML_LIKE_KEYS)
+_TEXTUAL_KEY_RE = _keys_re(TEXTUAL_KEYS)
+
 def normalize_lang(s: str) -> str:
     code = s.strip().lower().replace(" ", "").replace("_", "-")
     return LANG_ALIASES.get(code, s.strip().upper())
@@ -81,12 +125,16 @@ def normalize_lang(s: str) -> str:
 # ---------- CSV helpers ----------
 
 def _try_read(path, sep, enc, header=None):
+    # separator uvek zadajemo sami, pa nam python engine (sep=None) ne treba.
+    # pyarrow engine nije opcija: prvo pogađa tipove pa tek onda primeni dtype=str
+    # (SKU "001" -> "1", cena "1.00" -> "1.0").
     return pd.read_csv(
         path,
         dtype=str,
         keep_default_na=False,
         encoding=enc,
-        engine="python",
+        engine="c",
+        low_memory=False,
         sep=sep,
         quotechar='"',
         doublequote=True,
@@ -95,24 +143,55 @@ def _try_read(path, sep, enc, header=None):
         header=header,
     )
 
-def _find_header_and_sep(path, encodings, seps, max_lines=100):
-    # pokušaj da lociraš pravi header i delimiter
+def _find_header_and_sep(path, encodings, seps, max_lines=100, sample_bytes=65_536):
+    # pokušaj da lociraš pravi header i delimiter (fajl čitamo samo jednom)
+    try:
+        with open(path, "rb") as f:
+            raw = f.read(sample_bytes)
+    except OSError:
+        return None, None, None
     for enc in encodings:
         try:
-            with open(path, "r", encoding=enc, errors="ignore") as f:
-                lines = [next(f) for _ in range(max_lines)]
-        except Exception:
+            lines = raw.decode(enc, errors="ignore").split("\n")
+        except LookupError:
             continue
-        for i, line in enumerate(lines):
+        if len(raw) == sample_bytes:
+            lines = lines[:-1]  # poslednja linija je verovatno odsečena
+        for i, line in enumerate(lines[:max_lines]):
             for s in seps:
-                parts = [p.strip().strip('"').lower() for p in line.rstrip("\n\r").split(s)]
+                parts = [p.strip().strip('"').lower() for p in line.rstrip("\r").split(s)]
                 score = sum(1 for p in parts if p in EXPECTED_COL_HINTS)
                 if score >= 2:
                     return i, s, enc
     return None, None, None
 
+# BOM -> codec; UTF-32 LE mora pre UTF-16 LE (isti prva dva bajta)
+_BOMS = [
+    (b"\xff\xfe\x00\x00", "utf-32"),
+    (b"\x00\x00\xfe\xff", "utf-32"),
+    (b"\xef\xbb\xbf", "utf-8-sig"),
+    (b"\xff\xfe", "utf-16"),
+    (b"\xfe\xff", "utf-16"),
+]
+
+def _sniff_bom(path):
+    try:
+        with open(path, "rb") as f:
+            head = f.read(4)
+    except OSError:
+        return None
+    for bom, enc in _BOMS:
+        if head.startswith(bom):
+            return enc
+    return None
+
 def sniff_read_csv(path: str, sep: str = None, encoding: str = None) -> pd.DataFrame:
-    encodings = [encoding] if encoding else ["utf-8-sig", "utf-8", "cp1250", "latin1"]
+    if encoding:
+        encodings = [encoding]
+    else:
+        # BOM je pouzdan znak; ne pogađamo dalje (latin1 bi "uspeo" i pokvario tekst)
+        bom_enc = _sniff_bom(path)
+        encodings = [bom_enc] if bom_enc else ["utf-8-sig", "utf-8", "cp1250", "latin1"]
     seps = [sep] if sep is not None else [",", ";", "\t", "|"]
     # 1) auto-detekcija headera
     hdr_idx, hdr_sep, hdr_enc = _find_header_and_sep(path, encodings, seps)
@@ -121,54 +200,61 @@ def sniff_read_csv(path: str, sep: str = None, encoding: str = None) -> pd.DataF
             return _try_read(path, hdr_sep, hdr_enc, header=hdr_idx)
         except Exception:
             pass
-    # 2) brute-force fallback
+    # 2) brute-force fallback; rezultat sa jednom kolonom znači pogrešan separator
     last_err = None
+    single_col = None
     for enc in encodings:
-        for s in [None] + seps:
+        for s in seps:
             try:
                 df = _try_read(path, s, enc, header="infer")
-                if df.shape[1] == 1 and s is None:
-                    continue
-                return df
             except Exception as e:
                 last_err = e
                 continue
+            if df.shape[1] == 1 and len(seps) > 1:
+                if single_col is None:
+                    single_col = df
+                continue
+            return df
+    if single_col is not None:
+        return single_col
     raise last_err
 
+def write_csv(df: pd.DataFrame, path: str) -> None:
+    # izlaz je uvek utf-8-sig (BOM + UTF-8), kompatibilno sa Excel/Woo; pišemo u delovima
+    df.to_csv(path, index=False, encoding="utf-8-sig", chunksize=5000)
+
 # ---------- Heuristike za kolone ----------
 
-def is_never_translate(col: str) -> bool:
-    c = col.lower()
-    if any(key in c for key in NEVER_TRANSLATE_KEYS):
+# Predikati primaju naziv kolone već spušten na mala slova (col.lower() jednom po koloni)
+
+def is_never_translate(col_lower: str) -> bool:
+    if _NEVER_RE.search(col_lower) is not None:
         return True
-    if ATTRIBUTE_NAME_KEY in c and ATTRIBUTE_NAME_SUFFIX in c:
+    if ATTRIBUTE_NAME_KEY in col_lower and ATTRIBUTE_NAME_SUFFIX in col_lower:
         return True
     return False
 
-def is_ingredient_col(col: str) -> bool:
-    c = col.lower()
-    return any(k in c for k in INGREDIENTS_KEYS)
+def is_ingredient_col(col_lower: str) -> bool:
+    return _INGREDIENT_RE.search(col_lower) is not None
+
+def is_html_col(col_lower: str) -> bool:
+    return _HTML_RE.search(col_lower) is not None
 
-def looks_textual(col_name: str, series: pd.Series) -> bool:
-    if is_never_translate(col_name):
+def looks_textual(col_lower: str, series: pd.Series) -> bool:
+    if is_never_translate(col_lower):
         return False
-    c = col_name.lower()
-    if ATTRIBUTE_NAME_KEY in c and ATTRIBUTE_VALUES_SUFFIX in c:
+    if ATTRIBUTE_NAME_KEY in col_lower and ATTRIBUTE_VALUES_SUFFIX in col_lower:
         return True
-    # tipične tekstualne kolone
-    KEYS = [
-        "name", "title", "description", "short description", "excerpt", "content",
-        "meta: rank_math_title", "meta: rank_math_description", "yoast", "og:", "twitter:", "seo",
-    ]
-    if any(key in c for key in KEYS):
+    if _TEXTUAL_KEY_RE.search(col_lower) is not None:
         return True
     # heuristika po sadržaju
     if series.dtype == object:
-        sample = series.dropna().astype(str).head(50)
+        # object dtype -> .str koristi Python re, gde je [^\W\d_] Unicode (ćirilica, grčki...)
+        sample = series.dropna().head(50).astype(str).astype(object)
         if len(sample) == 0:
             return False
-        alpha_ratio = sum(any(ch.isalpha() for ch in s) for s in sample) / len(sample)
-        return alpha_ratio >= 0.3
+        alpha_ratio = sample.str.contains(_ALPHA_RE).mean()
+        return bool(alpha_ratio >= 0.3)
     return False
 
 def choose_columns(df: pd.DataFrame, exclude_ingredients: bool, only_cols: List[str]) -> Tuple[List[str], List[str], List[str]]:
@@ -180,22 +266,24 @@ def choose_columns(df: pd.DataFrame, exclude_ingredients: bool, only_cols: List[
         for col in df.columns:
             if col in only_cols:
                 cols.append(col)
-                if any(k in col.lower() for k in HTML_LIKE_KEYS):
+                if is_html_col(col.lower()):
                     html_cols.append(col)
             else:
                 skipped.append(col)
         return cols, html_cols, skipped
 
     for col in df.columns:
-        if is_never_translate(col):
+        cl = col.lower()
+        if is_never_translate(cl):
             skipped.append(col)
             continue
-        if exclude_ingredients and is_ingredient_col(col):
+        ingredient = is_ingredient_col(cl)
+        if exclude_ingredients and ingredient:
             skipped.append(col)
             continue
-        if looks_textual(col, df[col]) or is_ingredient_col(col):
+        if ingredient or looks_textual(cl, df[col]):
             cols.append(col)
-            if any(k in col.lower() for k in HTML_LIKE_KEYS):
+            if is_html_col(cl):
                 html_cols.append(col)
         else:
             skipped.append(col)
@@ -204,56 +292,243 @@ def choose_columns(df: pd.DataFrame, exclude_ingredients: bool, only_cols: List[
 
 # ---------- DeepL ----------
 
-def deepl_translate_batch(texts: List[str], html: bool, target_lang: str) -> Tuple[List[str], List[str]]:
+class RateLimiter:
+    """Zajednički prozor čekanja: posle 429 svi radnici čekaju isti rok."""
+
+    def __init__(self) -> None:
+        self._lock = threading.Lock()
+        self._next_allowed = 0.0
+
+    def wait(self) -> None:
+        with self._lock:
+            delay = self._next_allowed - time.monotonic()
+        if delay > 0:
+            time.sleep(delay)
+
+    def defer(self, delay: float) -> None:
+        with self._lock:
+            self._next_allowed = max(self._next_allowed, time.monotonic() + delay)
+
+RATE_LIMITER = RateLimiter()
+
+def _retry_after_seconds(resp) -> Optional[float]:
+    # Retry-After: broj sekundi ili HTTP datum
+    ra = resp.headers.get("Retry-After")
+    if ra:
+        try:
+            return max(0.0, float(ra))
+        except ValueError:
+            pass
+        try:
+            return max(0.0, parsedate_to_datetime(ra).timestamp() - time.time())
+        except (TypeError, ValueError):
+            pass
+    # X-RateLimit-Reset: sekunde do reseta ili unix timestamp
+    reset = resp.headers.get("X-RateLimit-Reset")
+    if reset:
+        try:
+            value = float(reset)
+        except ValueError:
+            return None
+        if value > 1e9:
+            value -= time.time()
+        return max(0.0, value)
+    return None
+
+class _SharedRetry(Retry):
+    """urllib3 Retry koji na 429 čekanje upisuje u zajednički RATE_LIMITER.
+
+    Svaki retry (i posle 5xx ili greške konekcije) čeka i aktivni 429 prozor.
+    Spavanje se dešava u niti radnika, pa radnik tokom njega ostaje zauzet (namerno).
+    """
+
+    def sleep(self, response=None) -> None:
+        # urllib3 za prvi retry vraća 0; najmanje backoff_factor (kao ranijih 1.5 s)
+        backoff = max(self.get_backoff_time(), self.backoff_factor)
+        # Retry-After / X-RateLimit-Reset, ali ne kraće od trenutnog backoff-a
+        ra = _retry_after_seconds(response) if response is not None else None
+        delay = backoff if ra is None else max(ra, backoff)
+        if response is not None and response.status == 429:
+            RATE_LIMITER.defer(delay)
+        else:
+            time.sleep(delay)
+        RATE_LIMITER.wait()
+
+DEEPL_RETRY = _SharedRetry(
+    total=5,
+    backoff_factor=1.5,
+    status_forcelist=[429, 500, 502, 503, 504],
+    allowed_methods=frozenset(["POST"]),
+    respect_retry_after_header=True,
+    raise_on_status=False,  # posle poslednjeg pokušaja raise_for_status daje HTTPError
+)
+
+def _mount_adapter(session: requests.Session, pool_size: int) -> None:
+    # pool mora biti bar koliki je broj radnika, inače se konekcije odbacuju
+    adapter = HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size, max_retries=DEEPL_RETRY)
+    session.mount("https://", adapter)
+    session.mount("http://", adapter)
+
+# Jedna sesija za sve batch-eve -> TCP/TLS konekcija se ponovo koristi
+SESSION = requests.Session()
+_mount_adapter(SESSION, DEEPL_CONCURRENCY)
+
+class TranslationCache:
+    """Lokalni SQLite keš prevoda po (sha1(tekst), jezik, html); deli se između radnika."""
+
+    def __init__(self, path: str) -> None:
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        with self._lock, self._conn:
+            self._conn.execute(
+                "CREATE TABLE IF NOT EXISTS cache("
+                "h BLOB, lang TEXT, html INT, translation TEXT, detected TEXT, "
+                "PRIMARY KEY (h, lang, html))"
+            )
+
+    @staticmethod
+    def key(text: str) -> bytes:
+        return hashlib.sha1(text.encode("utf-8")).digest()
+
+    def get_many(self, hashes: List[bytes], lang: str, html: bool) -> Dict[bytes, Tuple[str, str]]:
+        if not hashes:
+            return {}
+        placeholders = ",".join("?" * len(hashes))
+        with self._lock:
+            rows = self._conn.execute(
+                f"SELECT h, translation, detected FROM cache WHERE lang = ? AND html = ? AND h IN ({placeholders})",
+                [lang, int(html)] + hashes,
+            ).fetchall()
+        return {bytes(h): (tr, det) for h, tr, det in rows}
+
+    def put_many(self, rows: List[Tuple[bytes, str, str]], lang: str, html: bool) -> None:
+        if not rows:
+            return
+        with self._lock, self._conn:
+            self._conn.executemany(
+                "INSERT OR IGNORE INTO cache(h, lang, html, translation, detected) VALUES (?, ?, ?, ?, ?)",
+                [(h, lang, int(html), tr, det) for h, tr, det in rows],
+            )
+
+    def close(self) -> None:
+        with self._lock:
+            self._conn.close()
+
+def _pack(values: List[str], max_items: int = DEEPL_BATCH_SIZE, max_bytes: int = DEEPL_MAX_BATCH_BYTES) -> Iterator[List[str]]:
+    # pohlepno puni batch dok ne udari limit broja tekstova ili veličine tela zahteva;
+    # veličina je gornja granica (URL kodiranje je najviše 3 znaka po bajtu), pa se
+    # tekst ne kodira dva puta (pravo kodiranje radi _deepl_post)
+    batch: List[str] = []
+    size = 0
+    for v in values:
+        n = len("&text=") + 3 * len(v.encode("utf-8"))
+        if batch and (len(batch) >= max_items or size + n > max_bytes):
+            yield batch
+            batch, size = [], 0
+        batch.append(v)
+        size += n
+    if batch:
+        yield batch
+
+def deepl_translate_batch(session: requests.Session, texts: List[str], html: bool, target_lang: str,
+                          cache: Optional[TranslationCache] = None) -> Tuple[List[str], List[str]]:
     if not texts:
         return [], []
-    params: Dict[str, Any] = {
-        "auth_key": DEEPL_API_KEY,
-        "target_lang": target_lang,
-        "preserve_formatting": 1,
-    }
+    texts = ["" if t is None else str(t) for t in texts]
+    # duplikati u batch-u (npr. "In stock") se šalju samo jednom, prazna polja nikad
+    unique = [t for t in dict.fromkeys(texts) if t.strip()]
+    if not unique:
+        return texts, [""] * len(texts)
+    if cache is None:
+        u_trs, u_det = _deepl_post(session, unique, html, target_lang)
+    else:
+        u_trs, u_det = _translate_cached(session, unique, html, target_lang, cache)
+    mapping = dict(zip(unique, u_trs))
+    det_map = dict(zip(unique, u_det))
+    return [mapping.get(t, t) for t in texts], [det_map.get(t, "") for t in texts]
+
+def _translate_cached(session: requests.Session, texts: List[str], html: bool, target_lang: str,
+                      cache: TranslationCache) -> Tuple[List[str], List[str]]:
+    # pogoci iz keša se vraćaju odmah, ka DeepL-u idu samo promašaji
+    hashes = [TranslationCache.key(t) for t in texts]
+    hits = cache.get_many(hashes, target_lang, html)
+    miss_idx = [i for i, h in enumerate(hashes) if h not in hits]
+    trs = [hits[h][0] if h in hits else t for h, t in zip(hashes, texts)]
+    det = [hits[h][1] if h in hits else "" for h in hashes]
+    if miss_idx:
+        new_trs, new_det = _deepl_post(session, [texts[i] for i in miss_idx], html, target_lang)
+        fresh: List[Tuple[bytes, str, str]] = []
+        for i, tr, d in zip(miss_idx, new_trs, new_det):
+            trs[i] = tr
+            det[i] = d
+            fresh.append((hashes[i], tr, d))
+        cache.put_many(fresh, target_lang, html)
+    return trs, det
+
+_FORM_HEADERS = {"Content-Type": "application/x-www-form-urlencoded"}
+
+def _deepl_post(session: requests.Session, texts: List[str], html: bool, target_lang: str) -> Tuple[List[str], List[str]]:
+    pairs = [("auth_key", DEEPL_API_KEY), ("target_lang", target_lang), ("preserve_formatting", "1")]
     if html:
-        params["tag_handling"] = "html"
-    data = []
-    for t in texts:
-        data.append(("text", "" if t is None else str(t)))
-
-    # jednostavan retry/backoff
-    backoff = 1.5
-    tries = 0
-    while True:
-        tries += 1
-        try:
-            resp = requests.post(DEEPL_URL, data=list(params.items()) + data, timeout=60)
-        except Exception:
-            if tries < 5:
-                time.sleep(backoff)
-                backoff *= 1.8
-                continue
-            raise
-        if resp.status_code in (429, 500, 502, 503, 504):
-            if tries < 5:
-                time.sleep(backoff)
-                backoff *= 1.8
-                continue
-            resp.raise_for_status()
-        resp.raise_for_status()
-        j = resp.json()
-        trs = [item["text"] for item in j.get("translations", [])]
-        det = [item.get("detected_source_language", "") for item in j.get("translations", [])]
-        return trs, det
+        pairs.append(("tag_handling", "html"))
+    pairs += [("text", t) for t in texts]
+    # telo se kodira jednom i ponovo koristi u svakom retry-ju
+    body = urlencode(pairs)
+
+    # retry/backoff radi adapter (DEEPL_RETRY) unutar session.post; ovde samo poštujemo
+    # zajednički prozor posle 429. Radnik namerno zadržava svoje mesto i dok spava između
+    # pokušaja: kad DeepL vraća 429/5xx, novi batch-evi bi samo dodatno opteretili API.
+    RATE_LIMITER.wait()
+    resp = session.post(DEEPL_URL, data=body, headers=_FORM_HEADERS, timeout=60)
+    resp.raise_for_status()
+    j = _json_loads(resp.content)
+    trs = [item["text"] for item in j.get("translations", [])]
+    det = [item.get("detected_source_language", "") for item in j.get("translations", [])]
+    return trs, det
+
+# ---------- Prevod kolona ----------
+
+PendingBatch = Tuple[List[str], "Future[Tuple[List[str], List[str]]]"]
+
+def submit_column(executor: Executor, values: pd.Series, html: bool, target_lang: str,
+                  cache: Optional[TranslationCache] = None) -> List[PendingBatch]:
+    # samo jedinstvene, neprazne vrednosti kolone idu u batch-eve
+    uniques = [u for u in pd.unique(values) if u != ""]
+    return [
+        (batch, executor.submit(deepl_translate_batch, SESSION, batch, html=html, target_lang=target_lang, cache=cache))
+        for batch in _pack(uniques)
+    ]
+
+def collect_column(values: pd.Series, pending: List[PendingBatch]) -> Tuple[pd.Series, Dict[str, int]]:
+    mapping: Dict[str, str] = {}
+    det_map: Dict[str, str] = {}
+    for batch, future in pending:
+        trs, det = future.result()
+        # ako DeepL vrati manje prevoda, ostatak ostaje u originalu
+        mapping.update(zip(batch, trs))
+        det_map.update(zip(batch, det))
+
+    # detekcija se i dalje broji po redu, ne po jedinstvenoj vrednosti
+    detected: Dict[str, int] = {}
+    for v, n in values.value_counts().items():
+        lang = det_map.get(v)
+        if not lang:
+            continue
+        detected[lang] = detected.get(lang, 0) + int(n)
+
+    return values.map(lambda v: mapping.get(v, v)), detected
 
 # ---------- Utility ----------
 
+_str_len = np.frompyfunc(len, 1, 1)
+
 def estimate_chars(df: pd.DataFrame, cols: List[str]) -> Dict[str, int]:
-    out: Dict[str, int] = {}
-    total = 0
-    for col in cols:
-        s = df[col].fillna("").astype(str)
-        n = int(s.str.len().sum())
-        out[col] = n
-        total += n
-    out["__TOTAL__"] = total
+    # jedan prolaz preko object matrice umesto .str.len() po koloni
+    arr = df[cols].to_numpy(dtype=object)
+    arr = np.where(pd.isna(arr), "", arr)
+    totals = _str_len(arr).astype(np.int64).sum(axis=0)
+    out: Dict[str, int] = dict(zip(cols, totals.tolist()))
+    out["__TOTAL__"] = int(totals.sum())
     return out
 
 # ---------- Main ----------
@@ -282,6 +557,12 @@ def main():
                    help="Ne šalje ka API-ju; samo prikaže procenu karaktera po koloni i ukupno.")
     p.add_argument("--sep", dest="sep", help="Manuelni separator (npr. ',' ';' '\\t' '|').")
     p.add_argument("--encoding", dest="encoding", help="Manuelni encoding (npr. 'utf-8-sig', 'cp1250').")
+    p.add_argument("--cache", dest="cache", default=DEEPL_CACHE_PATH,
+                   help=f"SQLite keš prevoda (podrazumevano {DEEPL_CACHE_PATH}); isti tekstovi se ne šalju ponovo.")
+    p.add_argument("--no-cache", action="store_true", help="Ne koristi lokalni keš prevoda.")
+    p.add_argument("--workers", type=int, default=DEEPL_CONCURRENCY,
+                   help=f"Broj paralelnih radnika za slanje batch-eva, tj. zahteva ka DeepL-u u isto vreme "
+                        f"(podrazumevano DEEPL_CONCURRENCY={DEEPL_CONCURRENCY}).")
     args = p.parse_args()
 
     target_lang = normalize_lang(args.target_lang)
@@ -326,7 +607,7 @@ def main():
 
     if not cols:
         print("UPOZORENJE: Nije pronađena nijedna kolona za prevod. Proverite nazive kolona ili --only-cols.")
-        df.to_csv(args.out, index=False, encoding="utf-8-sig")
+        write_csv(df, args.out)
         sys.exit(0)
 
     print(f"[LANG] Ciljni jezik: {target_lang}")
@@ -345,31 +626,32 @@ def main():
         print(f"\n[ESTIMATE] UKUPNO: {total}")
         sys.exit(0)
 
-    detected_summary: Dict[str, int] = {}
-    for col in cols:
-        series = df[col].astype("object")
-        values = series.fillna("").astype(str).tolist()
-
-        out_vals: List[str] = []
-        det_langs: List[str] = []
-
-        is_html = col in html_cols
-        for i in range(0, len(values), 50):
-            batch = values[i:i+50]
-            trs, det = deepl_translate_batch(batch, html=is_html, target_lang=target_lang)
-            if len(trs) != len(batch):
-                diff = len(batch) - len(trs)
-                trs += batch[len(trs):]
-                det += [""] * diff
-            out_vals.extend(trs)
-            det_langs.extend(det)
-
-        for lang in det_langs:
-            if not lang:
-                continue
-            detected_summary[lang] = detected_summary.get(lang, 0) + 1
+    cache = None if args.no_cache else TranslationCache(args.cache)
+    workers = max(1, args.workers)
+    _mount_adapter(SESSION, workers)
 
-        df[col] = out_vals
+    # prvo se pošalju batch-evi svih kolona (paralelno), pa se kolone sklapaju redom
+    detected_summary: Dict[str, int] = {}
+    try:
+        with ThreadPoolExecutor(max_workers=workers) as executor:
+            # kolone su već str (dtype=str pri čitanju), pa je dovoljno samo popuniti prazna polja
+            col_values = {col: df[col].fillna("") for col in cols}
+            pending = {
+                col: submit_column(executor, col_values[col], col in html_cols, target_lang, cache)
+                for col in cols
+            }
+            try:
+                for col in cols:
+                    df[col], detected = collect_column(col_values[col], pending[col])
+                    for lang, n in detected.items():
+                        detected_summary[lang] = detected_summary.get(lang, 0) + n
+            except BaseException:
+                # jedan neuspešan batch prekida ceo prevod; batch-evi u redu se ne šalju
+                executor.shutdown(wait=False, cancel_futures=True)
+                raise
+    finally:
+        if cache is not None:
+            cache.close()
 
     if detected_summary:
         total_det = sum(detected_summary.values())
@@ -378,7 +660,7 @@ def main():
     else:
         print("[INFO] Nije dobijena detekcija jezika (polja možda bila prazna).")
 
-    df.to_csv(args.out, index=False, encoding="utf-8-sig")
+    write_csv(df, args.out)
     print("✅ Gotovo: {}".format(args.out))
 
 if __name__ == "__main__":